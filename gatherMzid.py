@@ -1,18 +1,61 @@
+import atexit
 import ftplib
+import json
 import logging
 import os
+import queue
+import random
+import re
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from gatherPrideData import MAX_WORKERS as METADATA_WORKERS, METADATA_FILENAME, fetch_and_save_metadata
 
 # count id files
 mzId_count = 0
 # logging
-logging.basicConfig(level=logging.ERROR, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+# (force, since importing gatherPrideData has already configured logging)
+logging.basicConfig(level=logging.ERROR, format='%(asctime)s %(levelname)s %(name)s %(message)s', force=True)
 logger = logging.getLogger(__name__)
 # config
 ip = "ftp.pride.ebi.ac.uk"
 base = "pride/data/archive"
 temp_dir = os.path.expanduser('~') + "/mzid_store/"
 os.makedirs(temp_dir, exist_ok=True)
+# local project directories already created this run, to skip repeat makedirs calls
+_created_dirs = set()
+# number of projects fetched concurrently (each worker holds its own FTP session)
+max_workers = 12
+# bytes read from the data connection per RETR callback (ftplib's default is 8KB)
+download_block_size = 1024 * 1024
+# downloads are written to <file name>.part and renamed when complete, so a failed one can be resumed
+PARTIAL_SUFFIX = '.part'
+# written into a project directory once all of its files have downloaded
+DONE_MARKER = '.done'
+# PRIDE metadata for each project is fetched in the background while its files download
+_metadata_executor = ThreadPoolExecutor(max_workers=METADATA_WORKERS)
+
+# idle logged-in FTP sessions, keyed by server, reused across listings and downloads
+_ftp_pools: dict[str, queue.LifoQueue] = {}
+_ftp_pools_lock = threading.Lock()
+# errors after which a session can't be trusted and is dropped rather than reused
+_FTP_CONNECTION_ERRORS = (EOFError, OSError, ftplib.error_temp, ftplib.error_reply, ftplib.error_proto)
+# start of a LIST entry (file type and permissions), as opposed to a directory header in LIST -R output
+_LIST_MODE_RE = re.compile(r'[-dlcbps][-rwxsStT]{9}')
+# servers found not to support MLSD, so later listings go straight to LIST
+_no_mlsd_hosts = set()
+# OS entropy for retry jitter, so sibling workers and processes never draw correlated delays
+_rng = random.SystemRandom()
+
+# directory listings are cached on disk; months that have ended are never re-listed,
+# anything that can still change (current month, year and archive roots) is refetched after the TTL
+listing_cache_path = temp_dir + "listing_cache.sqlite"
+listing_cache_ttl = 24 * 60 * 60
+_listing_cache_db = None
+_listing_cache_lock = threading.Lock()
 
 
 def all_years():
@@ -22,99 +65,257 @@ def all_years():
 
 def fetch_year(year):
     print (year)
+    mzid_paths = list_year_mzid_files(year)
+    if mzid_paths is not None:
+        # whole year listed in one go - group the files by project
+        project_files = {}
+        for mzid_path in mzid_paths:
+            ymp, file_name = mzid_path.rsplit('/', 1)
+            project_files.setdefault(ymp, []).append(file_name)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            _run_all(executor, fetch_project, list(project_files), list(project_files.values()))
+        return
+
     target_dir = base + '/' + year
     files = get_ftp_file_list(ip, target_dir)
-    for f in files:
-        fetch_month(year + '/' + f)
+    year_months = [year + '/' + f for f in files]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # list all months concurrently, then fetch all projects of the year concurrently
+        projects = [ymp for listing in executor.map(list_projects, year_months) for ymp in listing]
+        _run_all(executor, fetch_project, projects)
+
+def list_year_mzid_files(year: str) -> list[str] | None:
+    """List the mzid files of every project in a year with a single recursive LIST.
+
+    Returns:
+        'year/month/project/file name' paths, or None if the server doesn't
+        support LIST -R and the year has to be walked directory by directory.
+    """
+    year_dir = base + '/' + year
+
+    def list_recursive(ftp):
+        lines = []
+        ftp.retrlines('LIST -R /' + year_dir, lines.append)
+        mzid_paths = _parse_recursive_listing(lines, year)
+        if mzid_paths is None:
+            # e.g. vsftpd ignores -R and lists just the one directory
+            raise ftplib.error_perm("500 LIST -R not supported")
+        return mzid_paths
+
+    try:
+        return _cached_listing(year_dir, 'MZID -R', lambda: _with_ftp(ip, list_recursive))
+    except ftplib.all_errors as e:
+        logger.info(f"Recursive listing of {year_dir} failed ({e}), listing directory by directory")
+        return None
+
+def _parse_recursive_listing(lines: list[str], year: str) -> list[str] | None:
+    """Pick the mzid files at project level out of LIST -R output for a year directory.
+
+    Returns:
+        'year/month/project/file name' paths, or None if the output has no
+        directory headers (i.e. wasn't recursive).
+    """
+    year_dir = base + '/' + year
+    project = None  # month/project of the directory whose entries follow, None for other levels
+    found_header = False
+    mzid_paths = []
+    for line in lines:
+        if line.endswith(':') and not _LIST_MODE_RE.match(line):
+            # directory header, absolute or relative to the listed directory
+            found_header = True
+            rel = line[:-1].strip().lstrip('./')
+            if rel.startswith(year_dir + '/'):
+                rel = rel[len(year_dir) + 1:]
+            elif rel == year_dir:
+                rel = ''
+            project = rel if rel.count('/') == 1 else None
+        elif project is not None and 'mzid' in line.lower():
+            # the substring test rejects most lines (raw/peak files) before any field splitting
+            file_name = _list_line_file_name(line)
+            if file_name and _is_mzid_file_name(file_name):
+                mzid_paths.append(year + '/' + project + '/' + file_name)
+    return mzid_paths if found_header else None
 
 def fetch_month(year_month):
+    projects = list_projects(year_month)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        _run_all(executor, fetch_project, projects)
+
+def list_projects(year_month: str) -> list[str]:
+    """List the year/month/project paths in a month directory."""
     target_dir = base + '/' + year_month
     files = get_ftp_file_list(ip, target_dir)
-    for f in files:
-        ymp = year_month + '/' + f
-        fetch_project(ymp)
+    return [year_month + '/' + f for f in files]
+
+def _run_all(executor: ThreadPoolExecutor, func, *iterables):
+    """Run func over items on the executor, re-raising the first failure."""
+    for _ in executor.map(func, *iterables):
+        pass
 
-def fetch_project(year_month_project):
+def fetch_project(year_month_project, file_names: list[str] | None = None):
+    """Download the mzid files of a project, listing them first unless file_names is given."""
     target_dir = base + '/' + year_month_project
-    ftp = get_ftp_login(ip)
-    ftp.cwd('/' + target_dir)
     print ('>> ' + year_month_project)
 
-    # Get detailed listing to distinguish files from directories
-    listing = []
-    ftp.retrlines('LIST', listing.append)
-    ftp.quit()
-
-    for line in listing:
-        # Parse LIST output: first char is 'd' for directory, '-' for file
-        if line.startswith('-') and 'mzid' in line.lower():
-            # Extract filename: skip first 8 fields (permissions, links, owner, group, size, month, day, year/time)
-            # Then everything after is the filename (which may contain spaces)
-            parts = line.split(None, 8)  # Split on whitespace, max 9 parts
-            if len(parts) >= 9:
-                filename = parts[8]
-                # Skip .mgf files
-                if filename.lower().endswith('.mgf'):
-                    continue
-                print(filename)
-                fetch_file(year_month_project, filename)
-
-def fetch_file(ymp, file_name, max_retries: int = 0, base_delay: float = 1.0, max_delay: float = 300.0):
-    os.makedirs(temp_dir + ymp, exist_ok=True)
-    path = temp_dir + ymp + '/' + file_name
+    # Project fully downloaded on a previous run - don't contact the server at all
+    local_dir = os.path.join(temp_dir, year_month_project)
+    done_path = os.path.join(local_dir, DONE_MARKER)
+    if os.path.exists(done_path):
+        print(f"Skipping {year_month_project} (already downloaded)")
+        _queue_metadata(local_dir)
+        return
+
+    if file_names is None:
+        file_names = _cached_listing(
+            target_dir, 'MZID', lambda: _with_ftp(ip, lambda ftp: list_mzid_files(ftp, '/' + target_dir))
+        )
+    if file_names:
+        _make_local_dir(local_dir)
+        _queue_metadata(local_dir)
+    for filename in file_names:
+        print(filename)
+        fetch_file(year_month_project, filename)
+    if file_names:
+        # Only reached if every file succeeded; an interrupted project is resumed next run
+        open(done_path, 'w').close()
+
+def _queue_metadata(local_dir: str):
+    """Fetch the PRIDE metadata of a project in the background, unless it is already saved."""
+    pxd = os.path.basename(local_dir)
+    metadata_path = os.path.join(local_dir, METADATA_FILENAME)
+    if pxd.startswith('PXD') and not os.path.exists(metadata_path):
+        _metadata_executor.submit(_save_metadata, pxd, metadata_path)
+
+def _save_metadata(pxd: str, metadata_path: str):
+    """Background task for _queue_metadata, logging errors that would otherwise be lost in the future."""
+    try:
+        fetch_and_save_metadata(pxd, metadata_path)
+    except Exception as e:
+        logger.error(f"{pxd}: Failed to save metadata: {type(e).__name__}: {e}")
+
+def list_mzid_files(ftp: ftplib.FTP, ftp_dir: str) -> list[str]:
+    """List the names of the mzid files (not directories) in an FTP directory.
+
+    Uses MLSD, which returns typed entries, where the server supports it,
+    otherwise parses a single LIST. A server that rejects MLSD as an unknown
+    or unimplemented command is remembered, so it is only tried once.
+
+    Both commands take ftp_dir as an absolute path rather than changing
+    directory first, saving a round-trip.
+    """
+    if ftp.host not in _no_mlsd_hosts:
+        try:
+            return [
+                name for name, facts in ftp.mlsd(ftp_dir, facts=['type'])
+                if facts.get('type', '').lower() == 'file' and _is_mzid_file_name(name)
+            ]
+        except ftplib.error_perm as e:
+            if str(e)[:3] in ('500', '501', '502', '504'):
+                _no_mlsd_hosts.add(ftp.host)
+            logger.debug(f"MLSD failed in {ftp_dir} ({e}), falling back to LIST")
+
+    return [name for name in _list_file_names(ftp, ftp_dir) if _is_mzid_file_name(name)]
+
+def _nlst_names(ftp: ftplib.FTP, ftp_dir: str) -> list[str]:
+    """NLST an absolute directory, returning bare names (some servers prefix them with the directory)."""
+    return [name.rsplit('/', 1)[-1] for name in ftp.nlst(ftp_dir)]
+
+def _list_file_names(ftp: ftplib.FTP, ftp_dir: str) -> list[str]:
+    """List the names of the regular files in an FTP directory by parsing LIST output."""
+    file_names = []
+
+    # Parse each line as it arrives rather than collecting the raw listing first
+    def on_line(line):
+        file_name = _list_line_file_name(line)
+        if file_name:
+            file_names.append(file_name)
+
+    ftp.retrlines('LIST ' + ftp_dir, on_line)
+    return file_names
+
+def _list_line_file_name(line: str) -> str | None:
+    """Get the file name from a line of LIST output, or None if it isn't a regular file."""
+    # Parse LIST output: first char is 'd' for directory, '-' for file
+    if line.startswith('-'):
+        # Extract filename: skip first 8 fields (permissions, links, owner, group, size, month, day, year/time)
+        # Then everything after is the filename (which may contain spaces)
+        parts = line.split(None, 8)  # Split on whitespace, max 9 parts
+        if len(parts) >= 9:
+            return parts[8]
+    return None
+
+def _is_mzid_file_name(file_name: str) -> bool:
+    """Check if a file name looks like an mzIdentML file (possibly archived), skipping .mgf files."""
+    lower = file_name.lower()
+    return 'mzid' in lower and not lower.endswith('.mgf')
+
+def fetch_file(ymp, file_name, max_retries: int = 0, base_delay: float = 1.0, max_delay: float = 300.0,
+               deadline: float | None = None):
+    local_dir = os.path.join(temp_dir, ymp)
+    path = os.path.join(local_dir, file_name)
     if os.path.exists(path):
         print(f"Skipping {file_name} (already exists)")
         return
+    _make_local_dir(local_dir)
 
     ftp_dir = '/' + base + '/' + ymp
+    part_path = path + PARTIAL_SUFFIX
     attempt = 0
-    delay = base_delay
 
     while max_retries == 0 or attempt < max_retries:
         attempt += 1
-        ftp = get_ftp_login(ip)
+        ftp = _acquire_ftp(ip, deadline)
+        # resume from the end of any earlier partial download (this run or a previous one)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
 
         # fetch mzId file from pride
         try:
-            ftp.cwd(ftp_dir)
-            with open(path, 'wb') as f:
-                ftp.retrbinary("RETR " + file_name, f.write)
-            ftp.quit()
+            with open(part_path, 'ab') as f:
+                ftp.retrbinary(
+                    "RETR " + ftp_dir + '/' + file_name, f.write, blocksize=download_block_size, rest=offset or None
+                )
+            os.replace(part_path, path)
+            _release_ftp(ip, ftp)
             return  # Success
         except ftplib.error_perm as e:
+            _release_ftp(ip, ftp)  # the session itself is fine
+            _cleanup_partial_file(part_path)
+            if offset:
+                # The server may not support REST - start again from the beginning
+                logger.warning(f"Could not resume {file_name} at byte {offset} ({e}), restarting download")
+                continue
             # Permanent error (e.g., file not found) - don't retry
-            _cleanup_partial_file(path)
-            try:
-                ftp.quit()
-            except Exception:
-                pass
             error_msg = "%s: %s" % (file_name, e.args[0])
             logger.error(error_msg)
             raise e
         except (ConnectionResetError, OSError, EOFError, ftplib.error_temp) as e:
-            # Transient error - clean up and retry
-            _cleanup_partial_file(path)
-            try:
-                ftp.quit()
-            except Exception:
-                pass
+            # Transient error - drop the session and retry, keeping the partial file to resume from
+            _quit_quietly(ftp)
             logger.error(f"Download failed for {file_name} on attempt {attempt}: {type(e).__name__}: {e}")
 
             if max_retries != 0 and attempt >= max_retries:
                 logger.error(f"Max retries ({max_retries}) exceeded for {file_name}")
                 raise
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.error(f"Deadline exceeded for {file_name}")
+                raise
 
-            # Exponential backoff with jitter
-            jitter = delay * 0.1 * (2 * (time.time() % 1) - 1)
-            current_delay = min(delay + jitter, max_delay)
+            # Exponential backoff with full jitter, never sleeping past the deadline
+            current_delay = _backoff_delay(attempt, base_delay, max_delay, deadline)
             logger.info(f"Retrying {file_name} in {current_delay:.2f}s (attempt {attempt + 1})")
             print(f"  Retrying in {current_delay:.1f}s...")
             time.sleep(current_delay)
-            delay = min(delay * 2, max_delay)
 
     raise ftplib.error_temp(f"Download failed for {file_name} after all retries")
 
 
+def _make_local_dir(local_dir: str):
+    """Create a local project directory, once per run."""
+    if local_dir not in _created_dirs:
+        os.makedirs(local_dir, exist_ok=True)
+        _created_dirs.add(local_dir)
+
+
 def _cleanup_partial_file(path: str):
     """Remove a partially downloaded file if it exists."""
     if os.path.exists(path):
@@ -124,7 +325,20 @@ def _cleanup_partial_file(path: str):
         except OSError as e:
             logger.warning(f"Failed to clean up partial file {path}: {e}")
 
-def get_ftp_login(ftp_ip: str, max_retries: int = 10, base_delay: float = 1.0, max_delay: float = 300.0) -> ftplib.FTP:
+def _backoff_delay(attempt: int, base_delay: float, max_delay: float, deadline: float | None = None) -> float:
+    """Full-jitter exponential backoff: a uniformly random delay up to the capped exponential.
+
+    Spreading retries over the whole interval, rather than jittering around it,
+    stops concurrent workers that failed together from retrying together.
+    The delay is clamped so the retry happens no later than the deadline.
+    """
+    delay = _rng.uniform(0, min(max_delay, base_delay * 2 ** min(attempt - 1, 32)))
+    if deadline is not None:
+        delay = max(0.0, min(delay, deadline - time.monotonic()))
+    return delay
+
+def get_ftp_login(ftp_ip: str, max_retries: int = 10, base_delay: float = 1.0, max_delay: float = 300.0,
+                  deadline: float | None = None) -> ftplib.FTP:
     """Log in to an FTP server with exponential backoff.
 
     Args:
@@ -132,15 +346,15 @@ def get_ftp_login(ftp_ip: str, max_retries: int = 10, base_delay: float = 1.0, m
         max_retries: Maximum number of retry attempts (0 for infinite).
         base_delay: Initial delay in seconds before first retry.
         max_delay: Maximum delay in seconds between retries.
+        deadline: time.monotonic() value after which no more retries are made, whatever max_retries is.
 
     Returns:
         An authenticated FTP connection.
 
     Raises:
-        ftplib.all_errors: If max_retries is exceeded.
+        ftplib.all_errors: If max_retries or the deadline is exceeded.
     """
     attempt = 0
-    delay = base_delay
 
     while max_retries == 0 or attempt < max_retries:
         attempt += 1
@@ -159,41 +373,157 @@ def get_ftp_login(ftp_ip: str, max_retries: int = 10, base_delay: float = 1.0, m
             if max_retries != 0 and attempt >= max_retries:
                 logger.error(f"Max retries ({max_retries}) exceeded for FTP login to {ftp_ip}")
                 raise
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.error(f"Deadline exceeded for FTP login to {ftp_ip}")
+                raise
 
-            # Calculate delay with exponential backoff and jitter
-            jitter = delay * 0.1 * (2 * (time.time() % 1) - 1)  # +/- 10% jitter
-            current_delay = min(delay + jitter, max_delay)
-            logger.debug(f"Waiting {current_delay:.2f}s before retry (base delay: {delay:.2f}s, max: {max_delay}s)")
+            # Calculate delay with exponential backoff and full jitter, never sleeping past the deadline
+            current_delay = _backoff_delay(attempt, base_delay, max_delay, deadline)
+            logger.debug(f"Waiting {current_delay:.2f}s before retry (base delay: {base_delay:.2f}s, max: {max_delay}s)")
             time.sleep(current_delay)
 
-            # Exponential backoff: double the delay for next attempt
-            delay = min(delay * 2, max_delay)
-            logger.debug(f"Next retry delay set to {delay:.2f}s")
-
     # This should be unreachable when max_retries=0, but satisfies type checker
     raise ftplib.error_temp("FTP login failed after all retries")
 
-def get_ftp_file_list(ftp_ip: str, ftp_dir: str) -> list[str]:
-    """Get a list of files from an FTP directory."""
-    ftp = get_ftp_login(ftp_ip)
+def _get_ftp_pool(ftp_ip: str) -> queue.LifoQueue:
+    """Get the pool of idle sessions for ftp_ip."""
+    with _ftp_pools_lock:
+        return _ftp_pools.setdefault(ftp_ip, queue.LifoQueue())
+
+
+def _acquire_ftp(ftp_ip: str, deadline: float | None = None) -> ftplib.FTP:
+    """Take an idle logged-in session for ftp_ip from the pool, or log in a new one."""
     try:
-        ftp.cwd(ftp_dir)
-    except ftplib.error_perm as e:
-        logger.error(f"{ftp_dir}: {e}")
-        ftp.quit()
-        raise e
+        return _get_ftp_pool(ftp_ip).get_nowait()
+    except queue.Empty:
+        return get_ftp_login(ftp_ip, deadline=deadline)
+
+
+def _release_ftp(ftp_ip: str, ftp: ftplib.FTP):
+    """Return a healthy session to the pool for reuse."""
+    _get_ftp_pool(ftp_ip).put(ftp)
+
+
+def _quit_quietly(ftp: ftplib.FTP):
+    """Close a session, ignoring errors from one that is already dead."""
     try:
-        return ftp.nlst()
-    except ftplib.error_perm as e:
-        if str(e) == "550 No files found":
-            logger.info(f"FTP: No files in {ftp_dir}")
-        else:
-            logger.error(f"{ftp_dir}: {e}")
-        raise e
-    finally:
+        ftp.quit()
+    except Exception:
         ftp.close()
 
 
+def _close_ftp_pools():
+    """Log out of all pooled sessions (registered with atexit)."""
+    with _ftp_pools_lock:
+        pools = list(_ftp_pools.values())
+    for pool in pools:
+        while True:
+            try:
+                _quit_quietly(pool.get_nowait())
+            except queue.Empty:
+                break
+
+
+atexit.register(_close_ftp_pools)
+
+
+def _with_ftp(ftp_ip: str, func):
+    """Call func(ftp) on a pooled session.
+
+    A pooled session may have been closed by the server while idle, so on a
+    connection error the session is dropped and func is retried once on a
+    freshly logged-in one.
+    """
+    for attempt in (1, 2):
+        # The retry bypasses the pool, whose other idle sessions may be just as stale
+        ftp = _acquire_ftp(ftp_ip) if attempt == 1 else get_ftp_login(ftp_ip)
+        try:
+            result = func(ftp)
+        except _FTP_CONNECTION_ERRORS as e:
+            _quit_quietly(ftp)
+            if attempt == 2:
+                raise
+            logger.debug(f"Reconnecting to {ftp_ip} after {type(e).__name__}: {e}")
+            continue
+        except Exception:
+            _release_ftp(ftp_ip, ftp)
+            raise
+        _release_ftp(ftp_ip, ftp)
+        return result
+
+
+def get_ftp_file_list(ftp_ip: str, ftp_dir: str) -> list[str]:
+    """Get a list of files from an FTP directory."""
+    def nlst(ftp):
+        try:
+            return _nlst_names(ftp, '/' + ftp_dir.lstrip('/'))
+        except ftplib.error_perm as e:
+            if str(e) == "550 No files found":
+                logger.info(f"FTP: No files in {ftp_dir}")
+            else:
+                logger.error(f"{ftp_dir}: {e}")
+            raise e
+
+    return _cached_listing(ftp_dir, 'NLST', lambda: _with_ftp(ftp_ip, nlst))
+
+
+def _get_listing_cache() -> sqlite3.Connection:
+    """Open the listing cache database (call with _listing_cache_lock held)."""
+    global _listing_cache_db
+    if _listing_cache_db is None:
+        _listing_cache_db = sqlite3.connect(listing_cache_path, check_same_thread=False)
+        _listing_cache_db.execute(
+            "CREATE TABLE IF NOT EXISTS listing ("
+            "path TEXT, command TEXT, listing TEXT, fetched_at INTEGER, PRIMARY KEY (path, command))"
+        )
+    return _listing_cache_db
+
+
+def _listing_is_final(ftp_dir: str) -> bool:
+    """Check if ftp_dir lies under a year or year/month of the archive that has already ended."""
+    base_parts = base.split('/')
+    parts = ftp_dir.strip('/').split('/')
+    if parts[:len(base_parts)] != base_parts:
+        return False
+    parts = parts[len(base_parts):]
+    today = date.today()
+    try:
+        if len(parts) == 1:
+            return int(parts[0]) < today.year
+        if len(parts) >= 2:
+            return (int(parts[0]), int(parts[1])) < (today.year, today.month)
+    except ValueError:
+        pass
+    return False
+
+
+def _cached_listing(ftp_dir: str, command: str, fetch) -> list[str]:
+    """Get the listing of ftp_dir from the on-disk cache, or call fetch() and cache its result.
+
+    Args:
+        ftp_dir: The FTP directory that was listed.
+        command: The kind of listing ('NLST', 'LIST'), cached separately.
+        fetch: Function returning a fresh listing as a list of strings.
+    """
+    with _listing_cache_lock:
+        row = _get_listing_cache().execute(
+            "SELECT listing, fetched_at FROM listing WHERE path = ? AND command = ?", (ftp_dir, command)
+        ).fetchone()
+    if row is not None and (_listing_is_final(ftp_dir) or time.time() - row[1] < listing_cache_ttl):
+        logger.debug(f"Using cached {command} of {ftp_dir}")
+        return json.loads(row[0])
+
+    listing = fetch()
+    with _listing_cache_lock:
+        db = _get_listing_cache()
+        db.execute(
+            "INSERT OR REPLACE INTO listing VALUES (?, ?, ?, ?)",
+            (ftp_dir, command, json.dumps(listing), int(time.time())),
+        )
+        db.commit()
+    return listing
+
+
 # all_years()
 # fetch_project('2012/12/PXD000039')
 
@@ -215,6 +545,7 @@ fetch_year('2023')
 fetch_year('2024')
 fetch_year('2025')
 fetch_year('2026')
+_metadata_executor.shutdown()
 
 # # test_loop.year('2018')
 # # test_loop.year('2017')
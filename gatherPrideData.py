@@ -3,9 +3,17 @@
 import json
 import logging
 import os
+import threading
 import time
-import urllib.request
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # fall back to the (slower) stdlib json module
+    orjson = None
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s"
@@ -15,6 +23,110 @@ logger = logging.getLogger(__name__)
 MZID_STORE = os.path.expanduser("~") + "/mzid_store"
 PRIDE_API_BASE = "https://www.ebi.ac.uk/pride/ws/archive/v2/projects/"
 METADATA_FILENAME = "pride_metadata.json"
+# Projects the API answered 404 for, one per line, so later runs don't ask again
+MISSING_PXDS_PATH = MZID_STORE + "/missing_pxds.txt"
+# Number of projects whose metadata is fetched concurrently
+MAX_WORKERS = 8
+# Requests per second to the PRIDE API, shared by all workers
+RATE_LIMIT = 5.0
+
+# Shared session so HTTPS connections to the API are kept alive and reused across projects
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS, max_retries=0))
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Requests only wait once the bucket is empty, so bursts up to capacity go
+    out immediately. The refill rate backs off when the server signals it is
+    overloaded and recovers towards its initial value after sustained success.
+
+    Args:
+        capacity: Maximum number of tokens (burst size)
+        refill_rate: Tokens added per second
+    """
+
+    MIN_REFILL_RATE = 0.1
+    SUCCESSES_BEFORE_SPEED_UP = 20
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_refill_rate = refill_rate
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Take a token, blocking until one is available."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.refill_rate
+            time.sleep(wait)
+
+    def slow_down(self):
+        """Halve the refill rate (e.g. after HTTP 429 Too Many Requests)."""
+        with self._lock:
+            self._refill()
+            self.refill_rate = max(self.refill_rate / 2, self.MIN_REFILL_RATE)
+            self._successes = 0
+
+    def record_success(self):
+        """Record a successful request, doubling a reduced refill rate after enough of them."""
+        with self._lock:
+            if self.refill_rate >= self.max_refill_rate:
+                return
+            self._successes += 1
+            if self._successes >= self.SUCCESSES_BEFORE_SPEED_UP:
+                self._refill()
+                self.refill_rate = min(self.refill_rate * 2, self.max_refill_rate)
+                self._successes = 0
+
+
+_rate_limiter = TokenBucket(capacity=RATE_LIMIT, refill_rate=RATE_LIMIT)
+
+_missing_pxds: set[str] | None = None
+_missing_pxds_lock = threading.Lock()
+
+
+def _get_missing_pxds() -> set[str]:
+    """Get the projects known to be missing from the PRIDE API, loading them on first use."""
+    global _missing_pxds
+    with _missing_pxds_lock:
+        if _missing_pxds is None:
+            _missing_pxds = set()
+            if os.path.exists(MISSING_PXDS_PATH):
+                with open(MISSING_PXDS_PATH, "r") as f:
+                    _missing_pxds.update(f.read().split())
+                logger.info(f"Loaded {len(_missing_pxds)} known missing projects")
+        return _missing_pxds
+
+
+def is_known_missing(pxd: str) -> bool:
+    """Check if a previous run found the project missing from the PRIDE API."""
+    return pxd in _get_missing_pxds()
+
+
+def _record_missing(pxd: str):
+    """Append a project the PRIDE API doesn't know to MISSING_PXDS_PATH."""
+    missing = _get_missing_pxds()
+    with _missing_pxds_lock:
+        if pxd in missing:
+            return
+        missing.add(pxd)
+        with open(MISSING_PXDS_PATH, "a") as f:
+            f.write(pxd + "\n")
 
 
 def fetch_pride_metadata(pxd: str, max_retries: int = 5, base_delay: float = 1.0) -> dict | None:
@@ -33,17 +145,23 @@ def fetch_pride_metadata(pxd: str, max_retries: int = 5, base_delay: float = 1.0
 
     for attempt in range(1, max_retries + 1):
         try:
-            time.sleep(1)  # Rate limiting
-            with urllib.request.urlopen(url, timeout=30) as response:
-                data = response.read().decode("utf-8")
-                return json.loads(data)
-        except urllib.error.HTTPError as e:
-            if e.code == 404:
+            _rate_limiter.acquire()
+            response = _session.get(url, timeout=30)
+            if response.status_code == 404:
                 logger.warning(f"{pxd}: Project not found in PRIDE API (404)")
+                _record_missing(pxd)
                 return None
-            logger.error(f"{pxd}: HTTP error {e.code} on attempt {attempt}")
-        except urllib.error.URLError as e:
-            logger.error(f"{pxd}: URL error on attempt {attempt}: {e.reason}")
+            if response.status_code == 429:
+                _rate_limiter.slow_down()
+                logger.warning(f"{pxd}: Rate limited by PRIDE API, now {_rate_limiter.refill_rate:.2f} req/s")
+            response.raise_for_status()
+            _rate_limiter.record_success()
+            # Parse the raw bytes directly; json detects UTF-8/16/32 itself, so no decoded str copy is made
+            return (orjson or json).loads(response.content)
+        except requests.HTTPError as e:
+            logger.error(f"{pxd}: HTTP error {e.response.status_code} on attempt {attempt}")
+        except requests.ConnectionError as e:
+            logger.error(f"{pxd}: Connection error on attempt {attempt}: {e}")
         except Exception as e:
             logger.error(f"{pxd}: Error on attempt {attempt}: {e}")
 
@@ -56,23 +174,65 @@ def fetch_pride_metadata(pxd: str, max_retries: int = 5, base_delay: float = 1.0
     return None
 
 
+def fetch_and_save_metadata(pxd: str, metadata_path: str) -> bool:
+    """Fetch metadata for a project and write it to metadata_path.
+
+    Projects found missing from the API on an earlier run are not requested again.
+
+    Returns:
+        True if metadata was saved, False if fetch failed
+    """
+    if is_known_missing(pxd):
+        logger.debug(f"{pxd}: Known missing from PRIDE API, skipping")
+        return False
+    logger.info(f"{pxd}: Fetching metadata...")
+    metadata = fetch_pride_metadata(pxd)
+
+    if not metadata:
+        return False
+    if orjson:
+        with open(metadata_path, "wb") as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    else:
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+    logger.info(f"{pxd}: Saved metadata to {metadata_path}")
+    return True
+
+
+def iter_project_dirs():
+    """Yield (pxd, path) for each project directory in mzid_store.
+
+    Projects are stored as <year>/<month>/<PXD...>, so only those three levels
+    are scanned. DirEntry caches the file type from the directory read, so
+    this needs no per-entry stat() calls, unlike a full os.walk.
+    """
+    if not os.path.isdir(MZID_STORE):
+        return  # Nothing downloaded yet
+    with os.scandir(MZID_STORE) as years:
+        for year_entry in years:
+            if not year_entry.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(year_entry.path) as months:
+                for month_entry in months:
+                    if not month_entry.is_dir(follow_symlinks=False):
+                        continue
+                    with os.scandir(month_entry.path) as projects:
+                        for project_entry in projects:
+                            if project_entry.name.startswith("PXD") and project_entry.is_dir(follow_symlinks=False):
+                                yield project_entry.name, project_entry.path
+
+
 def gather_all_metadata():
     """Walk mzid_store and fetch metadata for all projects."""
     projects_found = 0
-    projects_fetched = 0
     projects_skipped = 0
-    projects_failed = 0
-
-    for dirpath, dirnames, filenames in os.walk(MZID_STORE):
-        dirname = os.path.basename(dirpath)
-
-        # Check if this is a PXD project directory
-        if not dirname.startswith("PXD"):
-            continue
+    pxds = []
+    metadata_paths = []
 
+    for pxd, project_dir in iter_project_dirs():
         projects_found += 1
-        pxd = dirname
-        metadata_path = os.path.join(dirpath, METADATA_FILENAME)
+        metadata_path = os.path.join(project_dir, METADATA_FILENAME)
 
         # Skip if metadata already exists
         if os.path.exists(metadata_path):
@@ -80,16 +240,20 @@ def gather_all_metadata():
             projects_skipped += 1
             continue
 
-        logger.info(f"{pxd}: Fetching metadata...")
-        metadata = fetch_pride_metadata(pxd)
+        # Skip if the API answered 404 on a previous run
+        if is_known_missing(pxd):
+            logger.debug(f"{pxd}: Known missing from PRIDE API, skipping")
+            projects_skipped += 1
+            continue
+
+        pxds.append(pxd)
+        metadata_paths.append(metadata_path)
 
-        if metadata:
-            with open(metadata_path, "w") as f:
-                json.dump(metadata, f, indent=2)
-            logger.info(f"{pxd}: Saved metadata to {metadata_path}")
-            projects_fetched += 1
-        else:
-            projects_failed += 1
+    # Requests are dominated by the round-trip to the API, so run several at once
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(fetch_and_save_metadata, pxds, metadata_paths))
+    projects_fetched = sum(results)
+    projects_failed = len(results) - projects_fetched
 
     logger.info(
         f"Complete: {projects_found} projects found, "
@@ -3,8 +3,12 @@
 import csv
 import logging
 import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import date
 
+import pandas as pd
 from lxml import etree
 
 # Logging setup
@@ -17,6 +21,25 @@ logger = logging.getLogger(__name__)
 MZID_STORE = os.path.expanduser("~") + "/mzid_store"
 REPORT_PATH = MZID_STORE + "/report.csv"
 CROSSLINKING_PATH = MZID_STORE + "/all_crosslinking.csv"
+# Worker processes checking files in parallel, and report rows written between flushes
+MAX_WORKERS = os.cpu_count() or 1
+FLUSH_EVERY = 50
+# Worker crashes a file may be caught in before it is checked on its own, and
+# the number after which it is left out of the report for a later run to retry
+SHARED_CRASH_LIMIT = 2
+MAX_CRASHES = 3
+# Names used by the other scripts for their files in MZID_STORE, mirroring gatherMzid's
+# DONE_MARKER, PARTIAL_SUFFIX and listing_cache_path (gatherMzid runs on import, so it
+# cannot be imported here)
+DONE_MARKER = ".done"
+PARTIAL_SUFFIX = ".part"
+LISTING_CACHE_NAME = "listing_cache.sqlite"
+# Files that are never mzIdentML: this report, gatherPrideData's 404 list, gatherMzid's
+# listing cache and project markers, partial downloads, validate_schemas' progress files,
+# the .tmp files report and validate_schemas write before replacing the CSV, and SQLite's
+# journal files for the listing cache
+SKIP_FILE_NAMES = frozenset({"report.csv", "missing_pxds.txt", LISTING_CACHE_NAME, DONE_MARKER})
+SKIP_FILE_SUFFIXES = (PARTIAL_SUFFIX, ".progress", ".tmp", "-journal", "-wal", "-shm")
 
 
 def format_file_size(size_bytes: int) -> str:
@@ -33,6 +56,7 @@ CSV_FIELDNAMES = [
     "date",
     "file_name",
     "file_size",
+    "file_size_bytes",
     "contains_MS1002511",
     "parseable",
     "schema_version",
@@ -68,161 +92,384 @@ def is_archive(filename: str) -> bool:
     return lower.endswith(".zip") or lower.endswith(".gz") or lower.endswith(".gzip")
 
 
-def contains_string(file_path: str, search_string: str, chunk_size: int = 1024 * 1024) -> bool:
-    """Check if file contains a string (chunked binary search for memory safety)."""
-    try:
-        search_bytes = search_string.encode("utf-8")
-        overlap = len(search_bytes) - 1
-        with open(file_path, "rb") as f:
-            prev_tail = b""
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                # Search in overlap + current chunk to catch matches spanning chunks
-                data = prev_tail + chunk
-                if search_bytes in data:
-                    return True
-                prev_tail = chunk[-overlap:] if len(chunk) > overlap else chunk
+MS1002511 = b"MS:1002511"
+# Crosslinking (MS:1002511) is only described from mzIdentML 1.2.0 onward
+FIRST_CROSSLINKING_VERSION = (1, 2, 0)
+
+
+class _SearchingReader:
+    """File wrapper that searches the bytes read through it for a pattern.
+
+    Handed to iterparse so the parser's own reads also do the search.
+    """
+
+    def __init__(self, f, pattern: bytes):
+        self._f = f
+        self._pattern = pattern
+        self._tail = b""  # end of the previous chunk, to catch matches spanning chunks
+        self.found = False
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        if data and not self.found:
+            overlap = len(self._pattern) - 1
+            if self._pattern in data or self._pattern in self._tail + data[:overlap]:
+                self.found = True
+            self._tail = (self._tail + data)[-overlap:] if len(data) < overlap else data[-overlap:]
+        return data
+
+
+def _schema_version(schema_location: str | None, version: str | None) -> str | None:
+    """Work out the schema version from the root element's attribute values.
+
+    Uses the schemaLocation (or noNamespaceSchemaLocation) attribute, or
+    failing that the version attribute.
+    Returns version string like '1.2.0' or None if not found.
+    """
+    if schema_location:
+        # Extract schema filename from URL
+        schema_parts = schema_location.split()
+        if len(schema_parts) >= 2:
+            schema_url = schema_parts[-1]
+            schema_fname = schema_url.split("/")[-1]
+            # Extract version from filename like "mzIdentML1.2.0.xsd"
+            if schema_fname.startswith("mzIdentML") and schema_fname.endswith(".xsd"):
+                return schema_fname[9:-4]  # Remove prefix and suffix
+
+    # Fallback: version attribute on root element
+    return version or None
+
+
+def schema_version_from_root(root: etree._Element) -> str | None:
+    """Extract schema version from the root element of an mzIdentML file."""
+    schema_location = root.attrib.get(
+        "{http://www.w3.org/2001/XMLSchema-instance}schemaLocation"
+    )
+    if not schema_location:
+        schema_location = root.attrib.get(
+            "{http://www.w3.org/2001/XMLSchema-instance}noNamespaceSchemaLocation"
+        )
+    return _schema_version(schema_location, root.attrib.get("version"))
+
+
+# The root element is expected within this many bytes of the start of the file
+HEADER_BYTES = 4096
+_ROOT_TAG_RE = re.compile(rb"<(?:[\w.-]+:)?MzIdentML\b[^>]*>")
+_SCHEMA_LOCATION_RE = re.compile(rb"""[\s:]schemaLocation\s*=\s*(["'])(.*?)\1""", re.S)
+_NO_NAMESPACE_SCHEMA_LOCATION_RE = re.compile(rb"""[\s:]noNamespaceSchemaLocation\s*=\s*(["'])(.*?)\1""", re.S)
+_VERSION_RE = re.compile(rb"""\sversion\s*=\s*(["'])(.*?)\1""", re.S)
+
+
+def sniff_schema_version(header: bytes) -> tuple[bool, str | None]:
+    """Extract schema version from the root start tag in the first bytes of a file.
+
+    Avoids running lxml just to read the root element's attributes.
+
+    Returns:
+        (whether the root start tag was found, schema version or None)
+    """
+    root_tag = _ROOT_TAG_RE.search(header)
+    if root_tag is None:
+        return False, None
+
+    def attribute(pattern: re.Pattern) -> str | None:
+        match = pattern.search(root_tag.group())
+        return match.group(2).decode("utf-8", "replace") if match else None
+
+    schema_location = attribute(_SCHEMA_LOCATION_RE) or attribute(_NO_NAMESPACE_SCHEMA_LOCATION_RE)
+    return True, _schema_version(schema_location, attribute(_VERSION_RE))
+
+
+def predates_crosslinking(schema_version: str | None) -> bool:
+    """Check whether a schema version is older than FIRST_CROSSLINKING_VERSION.
+
+    Unknown or unrecognised versions are not assumed to be older.
+    """
+    if not schema_version:
         return False
-    except Exception as e:
-        logger.warning(f"Error reading {file_path} for string search: {e}")
+    try:
+        version = tuple(int(part) for part in schema_version.split("."))
+    except ValueError:
         return False
+    return version < FIRST_CROSSLINKING_VERSION
+
+
+# Parser settings for the parseability check: allow very large documents, and
+# skip DTDs, entity expansion and the xml:id table, none of which are needed
+ITERPARSE_OPTIONS = dict(huge_tree=True, resolve_entities=False, load_dtd=False, collect_ids=False)
+
 
+def _iterparse_file(source, read_version: bool = True) -> tuple[bool, str | None, str | None]:
+    """Parse an mzIdentML file with lxml iterparse (memory-efficient).
 
-def check_parseable(file_path: str) -> tuple[bool, str | None]:
-    """Try to parse file with lxml iterparse (memory-efficient).
+    Args:
+        source: File-like object to parse
+        read_version: Whether to take the schema version from the root element
 
     Returns:
-        (True, None) if parseable, (False, error_message) if not
+        (parseable, parse error message or None, schema version or None)
     """
+    schema_version = None
     try:
-        # Use iterparse to avoid loading entire tree into memory
-        for event, elem in etree.iterparse(file_path, events=("end",)):
-            elem.clear()  # Free memory as we go
-        return True, None
+        for event, elem in etree.iterparse(source, events=("end",), **ITERPARSE_OPTIONS):
+            if read_version:
+                # The root's attributes are complete by the first end event
+                schema_version = schema_version_from_root(elem.getroottree().getroot())
+                read_version = False
+            # Free memory as we go, including the emptied earlier siblings
+            # (the root has none we can delete, only top-level comments/PIs)
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
     except Exception as e:
-        return False, str(e)
+        return False, str(e), None
+    return True, None, schema_version
 
 
-def extract_schema_version(file_path: str) -> str | None:
-    """Extract schema version from mzIdentML file.
+def scan_file(file_path: str, chunk_size: int = 1024 * 1024) -> tuple[bool, bool, str | None, str | None]:
+    """Check an mzIdentML file in a single read.
 
-    Reads only the root element to get the schemaLocation attribute or version attribute.
-    Returns version string like '1.2.0' or None if not found.
+    The file is parsed with iterparse while the bytes the parser reads are
+    searched for MS:1002511. The schema version is sniffed from the root start
+    tag in the first HEADER_BYTES, falling back to the parsed root element;
+    files whose sniffed version predates crosslinking aren't searched at all.
+
+    Returns:
+        (contains MS:1002511, parseable, parse error message or None,
+        schema version or None); the schema version is only given for
+        parseable files
     """
     try:
-        # Use iterparse and stop after the first start event (root element)
-        for event, elem in etree.iterparse(file_path, events=("start",)):
-            # Try schemaLocation first
-            schema_location = elem.attrib.get(
-                "{http://www.w3.org/2001/XMLSchema-instance}schemaLocation"
-            )
-            if not schema_location:
-                schema_location = elem.attrib.get(
-                    "{http://www.w3.org/2001/XMLSchema-instance}noNamespaceSchemaLocation"
-                )
-
-            if schema_location:
-                # Extract schema filename from URL
-                schema_parts = schema_location.split()
-                if len(schema_parts) >= 2:
-                    schema_url = schema_parts[-1]
-                    schema_fname = schema_url.split("/")[-1]
-                    # Extract version from filename like "mzIdentML1.2.0.xsd"
-                    if schema_fname.startswith("mzIdentML") and schema_fname.endswith(".xsd"):
-                        return schema_fname[9:-4]  # Remove prefix and suffix
-
-            # Fallback: check version attribute on root element
-            version = elem.attrib.get("version")
-            if version:
-                return version
-
-            break  # Only process root element
-        return None
-    except Exception:
-        return None
-
-
-def load_existing_report() -> set[tuple[str, str]]:
-    """Load existing report and return set of (project, file_name) tuples."""
-    existing = set()
+        f = open(file_path, "rb")
+    except OSError as e:
+        return False, False, str(e), None
+
+    with f:
+        if hasattr(os, "posix_fadvise"):
+            # Read once front to back
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        has_root, schema_version = sniff_schema_version(f.read(HEADER_BYTES))
+        f.seek(0)
+
+        search = not predates_crosslinking(schema_version)
+        reader = _SearchingReader(f, MS1002511) if search else f
+        parseable, error, root_version = _iterparse_file(reader, read_version=not has_root)
+        if search and not parseable:
+            # Read the rest so the search still covers the whole file
+            try:
+                while reader.read(chunk_size):
+                    pass
+            except OSError as read_error:
+                logger.warning(f"Error reading {file_path} for string search: {read_error}")
+        found = search and reader.found
+
+    if not parseable:
+        return found, False, error, None
+    return found, True, None, schema_version if has_root else root_version
+
+
+def upgrade_report_columns():
+    """Rewrite an existing report whose columns differ from CSV_FIELDNAMES.
+
+    Reports written before a column was added get it with empty values, so
+    new rows can be appended under the same header.
+    """
+    if not os.path.exists(REPORT_PATH):
+        return
+
+    with open(REPORT_PATH, "r", newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or reader.fieldnames == CSV_FIELDNAMES:
+            return
+        rows = list(reader)
+
+    tmp_path = REPORT_PATH + ".tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, REPORT_PATH)
+    logger.info(f"Updated columns of {len(rows)} rows in {REPORT_PATH}")
+
+
+def load_existing_report() -> dict[str, set[str]]:
+    """Load existing report and return the file names already in it, by project."""
+    existing = {}
+    count = 0
     if os.path.exists(REPORT_PATH):
         try:
             with open(REPORT_PATH, "r", newline="") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    existing.add((row["project"], row["file_name"]))
-            logger.info(f"Loaded {len(existing)} existing entries from report")
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is not None:
+                    # Rows are read as lists, so find the key columns once
+                    project_column = header.index("project")
+                    file_name_column = header.index("file_name")
+                    for row in reader:
+                        existing.setdefault(row[project_column], set()).add(row[file_name_column])
+                        count += 1
+            logger.info(f"Loaded {count} existing entries from report")
         except Exception as e:
             logger.warning(f"Error loading existing report: {e}")
     return existing
 
 
-def generate_report():
-    """Walk mzid_store and generate/append to report CSV."""
-    existing_entries = load_existing_report()
-    file_exists = os.path.exists(REPORT_PATH)
+def process_file(file_path: str, project: str, file_date: date | None, file_size: int) -> dict:
+    """Run all checks on one file and return its report row.
 
-    with open(REPORT_PATH, "a", newline="") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
-
-        # Write header only if new file
-        if not file_exists:
-            writer.writeheader()
+    Runs in a worker process, so it only depends on its arguments.
+    """
+    logger.info(f"Processing: {file_path}")
+
+    # Check for MS:1002511, parseability and schema version in one pass
+    has_ms1002511, parseable, error_message, schema_version = scan_file(file_path)
+
+    return report_row(file_path, project, file_date, file_size, has_ms1002511, parseable, schema_version, error_message)
+
+
+def report_row(
+    file_path: str,
+    project: str,
+    file_date: date | None,
+    file_size: int,
+    has_ms1002511: bool,
+    parseable: bool,
+    schema_version: str | None,
+    error_message: str | None,
+) -> dict:
+    """Build a report row (schema_valid is left for validate_schemas)."""
+    return {
+        "project": project,
+        "date": file_date.isoformat() if file_date else "",
+        "file_name": os.path.basename(file_path),
+        "file_size": format_file_size(file_size),
+        "file_size_bytes": file_size,
+        "contains_MS1002511": has_ms1002511,
+        "parseable": parseable,
+        "schema_version": schema_version or "",
+        "schema_valid": "",
+        "error_message": error_message or "",
+    }
+
+
+def check_files(tasks: list[tuple]):
+    """Run process_file on (file_path, project, file_date, file_size) tasks in parallel.
+
+    Yields report rows as files finish. A worker dying (e.g. OOM-killed)
+    breaks the whole pool, so the files that hadn't finished are run again
+    in a new pool. Only files that were being worked on when a worker died
+    count that crash against them: after SHARED_CRASH_LIMIT crashes a file
+    is run on its own, and after MAX_CRASHES it is left out of the report
+    so a later run tries it again.
+    """
+    crash_counts = {}
+    pending = list(tasks)
+    while pending:
+        shared = [task for task in pending if crash_counts.get(task, 0) < SHARED_CRASH_LIMIT]
+        alone = [task for task in pending if crash_counts.get(task, 0) >= SHARED_CRASH_LIMIT]
+        pending = []
+        for batch, workers in [(shared, MAX_WORKERS)] + [([task], 1) for task in alone]:
+            if not batch:
+                continue
+            crashed, suspects = yield from _check_batch(batch, workers)
+            if not crashed:
+                continue
+
+            # If it isn't known which files were running, count the crash against them all
+            for task in suspects or crashed:
+                crash_counts[task] = crash_counts.get(task, 0) + 1
+            for task in crashed:
+                if crash_counts.get(task, 0) >= MAX_CRASHES:
+                    logger.error(f"Worker process died {MAX_CRASHES} times on {task[0]}; leaving it for a later run")
+                else:
+                    pending.append(task)
+        if pending:
+            logger.warning(f"Worker process died; running {len(pending)} unfinished files again")
+
+
+def _check_batch(batch: list[tuple], workers: int):
+    """Run process_file on a batch of tasks in one pool, yielding rows as they finish.
 
-        for dirpath, dirnames, filenames in os.walk(MZID_STORE):
-            for filename in filenames:
-                # Skip the report file itself
-                if filename == "report.csv":
+    Returns:
+        (tasks lost to a worker crash, those of them that were running at the time)
+    """
+    crashed = []
+    running = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_file, *task): task for task in batch}
+        not_done = set(futures)
+        while not_done:
+            # Wake up regularly to note which files are being worked on
+            done, not_done = wait(not_done, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = futures[future]
+                try:
+                    row = future.result()
+                except BrokenProcessPool:
+                    crashed.append(task)
                     continue
+                except Exception as e:
+                    row = report_row(*task, False, False, None, f"Processing error: {e}")
+                yield row
+            if not crashed:
+                running = {futures[future] for future in not_done if future.running()}
+    return crashed, [task for task in crashed if task in running]
 
-                # Skip archives
-                if is_archive(filename):
-                    logger.debug(f"Skipping archive: {filename}")
-                    continue
 
-                # Parse directory for project and date
-                project, file_date = parse_directory(dirpath)
+def generate_report():
+    """Walk mzid_store and generate/append to report CSV.
 
-                # Skip already processed files
-                if (project, filename) in existing_entries:
-                    logger.debug(f"Skipping already processed: {project}/{filename}")
-                    continue
+    New files are checked in parallel by a pool of worker processes (see
+    check_files); rows are written by this process as each file finishes.
+    """
+    upgrade_report_columns()
+    existing_entries = load_existing_report()
+    file_exists = os.path.exists(REPORT_PATH)
 
-                file_path = os.path.join(dirpath, filename)
-                logger.info(f"Processing: {file_path}")
+    # Collect the files to process first, so they can be spread over the workers
+    tasks = []
+    for dirpath, dirnames, filenames in os.walk(MZID_STORE):
+        if not filenames:
+            continue
 
-                # Get file size
-                file_size = os.path.getsize(file_path)
+        # Parse directory for project and date, the same for all its files
+        project, file_date = parse_directory(dirpath)
+        processed = existing_entries.get(project, ())
 
-                # Check for MS:1002511
-                has_ms1002511 = contains_string(file_path, "MS:1002511")
+        for filename in filenames:
+            # Skip already processed files first, as most are on a rerun
+            if filename in processed:
+                logger.debug(f"Skipping already processed: {project}/{filename}")
+                continue
 
-                # Check if parseable
-                parseable, parse_error = check_parseable(file_path)
+            # Skip the other scripts' bookkeeping files
+            if filename in SKIP_FILE_NAMES or filename.endswith(SKIP_FILE_SUFFIXES):
+                continue
 
-                # Extract schema version
-                schema_version = extract_schema_version(file_path) if parseable else None
+            # Skip archives
+            if is_archive(filename):
+                logger.debug(f"Skipping archive: {filename}")
+                continue
 
-                # Set error message if not parseable
-                error_message = parse_error if not parseable else None
+            file_path = os.path.join(dirpath, filename)
+            # Only stat files that will be processed
+            tasks.append((file_path, project, file_date, os.path.getsize(file_path)))
 
-                # Write row
-                writer.writerow(
-                    {
-                        "project": project,
-                        "date": file_date.isoformat() if file_date else "",
-                        "file_name": filename,
-                        "file_size": format_file_size(file_size),
-                        "contains_MS1002511": has_ms1002511,
-                        "parseable": parseable,
-                        "schema_version": schema_version or "",
-                        "schema_valid": "",
-                        "error_message": error_message or "",
-                    }
-                )
-                csvfile.flush()  # Flush after each row for incremental progress
+    logger.info(f"Processing {len(tasks)} new files with {MAX_WORKERS} workers")
+
+    with open(REPORT_PATH, "a", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+
+        # Write header only if new file
+        if not file_exists:
+            writer.writeheader()
+
+        for count, row in enumerate(check_files(tasks), start=1):
+            writer.writerow(row)
+            if count % FLUSH_EVERY == 0:
+                csvfile.flush()  # Flush periodically for incremental progress
 
     logger.info(f"Report written to {REPORT_PATH}")
 
@@ -238,17 +485,11 @@ def generate_crosslinking_report():
         os.remove(CROSSLINKING_PATH)
         logger.info(f"Deleted existing {CROSSLINKING_PATH}")
 
-    count = 0
-    with open(REPORT_PATH, "r", newline="") as infile, \
-         open(CROSSLINKING_PATH, "w", newline="") as outfile:
-        reader = csv.DictReader(infile)
-        writer = csv.DictWriter(outfile, fieldnames=CSV_FIELDNAMES)
-        writer.writeheader()
-
-        for row in reader:
-            if row["contains_MS1002511"] == "True":
-                writer.writerow(row)
-                count += 1
+    # Read everything as text, so values are written back exactly as read
+    report = pd.read_csv(REPORT_PATH, dtype=str, keep_default_na=False)
+    crosslinking = report[report["contains_MS1002511"] == "True"]
+    crosslinking.to_csv(CROSSLINKING_PATH, index=False)
+    count = len(crosslinking)
 
     logger.info(f"Crosslinking report written to {CROSSLINKING_PATH} ({count} rows)")
 
@@ -1,7 +1,9 @@
 """schema_validate.py - Validate an mzIdentML file against XSD schema."""
 
+import atexit
 import os
-from multiprocessing import Pool
+import threading
+from multiprocessing import Pool, TimeoutError as MpTimeoutError
 from typing import List, Tuple
 
 from lxml import etree
@@ -19,11 +21,42 @@ SUPPORTED_SCHEMAS = [
 ]
 
 
+# Single long-lived worker process for validation, created on first use
+_validator_pool = None
+_validator_pool_lock = threading.Lock()
+
+
+def _get_validator_pool():
+    """Return the validation worker pool, starting it if needed."""
+    global _validator_pool
+    with _validator_pool_lock:
+        if _validator_pool is None:
+            _validator_pool = Pool(1, initializer=_preload_schemas)
+        return _validator_pool
+
+
+def _reset_validator_pool():
+    """Kill the validation worker so the next call starts a fresh one.
+
+    Used when a validation hangs or the worker dies, since the stuck process
+    can't be reused.
+    """
+    global _validator_pool
+    with _validator_pool_lock:
+        pool, _validator_pool = _validator_pool, None
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+
+
+atexit.register(_reset_validator_pool)
+
+
 def schema_validate(xml_file: str) -> bool:
     """Validate an mzIdentML file against its declared schema.
 
-    Runs validation in a subprocess to ensure memory is fully released
-    after validation completes (lxml/libxml2 holds memory otherwise).
+    Runs validation in a separate worker process so lxml/libxml2 memory is
+    kept out of this process; the worker is reused between calls.
 
     Args:
         xml_file: Path to the mzIdentML file
@@ -31,8 +64,7 @@ def schema_validate(xml_file: str) -> bool:
     Returns:
         True if the XML is valid, False otherwise
     """
-    with Pool(1) as pool:
-        success, schema_version, messages = pool.apply(_schema_validate_impl, (xml_file,))
+    success, schema_version, messages = _get_validator_pool().apply(_schema_validate_impl, (xml_file,))
 
     for msg in messages:
         print(msg)
@@ -40,6 +72,42 @@ def schema_validate(xml_file: str) -> bool:
     return success
 
 
+# Compiled schemas by file name, filled as each worker process starts
+_SCHEMA_CACHE: dict[str, etree.XMLSchema] = {}
+
+
+def _get_schema(schema_fname: str) -> etree.XMLSchema:
+    """Load and compile a supported schema, or return the cached copy.
+
+    Compiling the XSD is the expensive part of validation, so each worker
+    does it once per schema rather than once per file.
+
+    Raises:
+        FileNotFoundError: If the schema file is missing from SCHEMA_DIR
+    """
+    schema = _SCHEMA_CACHE.get(schema_fname)
+    if schema is None:
+        schema_path = os.path.join(SCHEMA_DIR, schema_fname)
+        with open(schema_path, "r") as schema_file:
+            schema_root = etree.XML(schema_file.read())
+        schema = _SCHEMA_CACHE[schema_fname] = etree.XMLSchema(schema_root)
+    return schema
+
+
+def _preload_schemas():
+    """Compile all supported schemas up front (validation worker initializer).
+
+    Schemas that fail to load (e.g. missing files) are skipped here, since
+    an initializer error would kill the worker; validating against one
+    reports the problem then.
+    """
+    for schema_fname in SUPPORTED_SCHEMAS:
+        try:
+            _get_schema(schema_fname)
+        except Exception:
+            pass
+
+
 def _extract_schema_version(schema_fname: str) -> str | None:
     """Extract version string from schema filename (e.g., '1.2.0' from 'mzIdentML1.2.0.xsd')."""
     if schema_fname.startswith("mzIdentML") and schema_fname.endswith(".xsd"):
@@ -95,11 +163,9 @@ def _schema_validate_impl(xml_file: str) -> Tuple[bool, str | None, List[str]]:
         messages.append(f"Unsupported schema: {schema_fname}")
         return False, schema_version, messages
 
+    schema_path = os.path.join(SCHEMA_DIR, schema_fname)
     try:
-        schema_path = os.path.join(SCHEMA_DIR, schema_fname)
-        with open(schema_path, "r") as schema_file:
-            schema_root = etree.XML(schema_file.read())
-        schema = etree.XMLSchema(schema_root)
+        schema = _get_schema(schema_fname)
 
         if schema.validate(xml_doc):
             return True, schema_version, messages
@@ -124,7 +190,8 @@ def schema_validate_with_messages(xml_file: str, timeout: int = VALIDATION_TIMEO
     """Validate an mzIdentML file and return validation messages.
 
     Like schema_validate(), but returns error messages instead of printing them.
-    Runs validation in a subprocess to ensure memory is fully released.
+    Runs validation in the shared worker process, which is replaced if it
+    times out.
 
     Args:
         xml_file: Path to the mzIdentML file
@@ -133,11 +200,11 @@ def schema_validate_with_messages(xml_file: str, timeout: int = VALIDATION_TIMEO
     Returns:
         Tuple of (success, schema_version, list of error/info messages)
     """
-    with Pool(1) as pool:
-        async_result = pool.apply_async(_schema_validate_impl, (xml_file,))
-        try:
-            success, schema_version, messages = async_result.get(timeout=timeout)
-        except TimeoutError:
-            pool.terminate()
-            return False, None, [f"Validation timed out after {timeout}s"]
+    async_result = _get_validator_pool().apply_async(_schema_validate_impl, (xml_file,))
+    try:
+        success, schema_version, messages = async_result.get(timeout=timeout)
+    except MpTimeoutError:
+        # The worker is still busy (or was killed, e.g. by the OOM killer)
+        _reset_validator_pool()
+        return False, None, [f"Validation timed out after {timeout}s"]
     return success, schema_version, messages
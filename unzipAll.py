@@ -3,12 +3,15 @@ import logging
 import os
 import shutil
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
 # logging - same style as gatherMzid.py
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s %(name)s %(message)s')
 logger = logging.getLogger(__name__)
 
 base_dir = "/home/cc/mzid_store"
+max_workers = os.cpu_count() or 1
+copy_buffer_size = 1024 * 1024
 
 
 def unzip_all():
@@ -18,26 +21,37 @@ def unzip_all():
 
     logger.debug(f"Starting extraction walk in {base_dir}")
 
+    # Find all archives first, then extract them in parallel. Archives in the same
+    # directory can write the same output file, so each directory's archives are
+    # extracted in order by one worker.
+    archives_by_dir = {}
     for root, dirs, files in os.walk(base_dir):
+        archives = []
         for file_name in files:
             file_path = os.path.join(root, file_name)
             lower_name = file_name.lower()
 
             if lower_name.endswith('.zip'):
                 logger.debug(f"Found zip archive: {file_path}")
-                result = extract_zip(file_path)
-                if result:
-                    extracted_files.extend(result)
-                else:
-                    failed_extractions.append(file_path)
+                archives.append(('zip', file_path))
 
             elif lower_name.endswith('.gz') or lower_name.endswith('.gzip'):
                 logger.debug(f"Found gzip archive: {file_path}")
-                result = extract_gzip(file_path)
-                if result:
-                    extracted_files.append(result)
-                else:
+                archives.append(('gzip', file_path))
+        if archives:
+            archives_by_dir[root] = archives
+
+    logger.debug(f"Extracting archives in {len(archives_by_dir)} directories with {max_workers} workers")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for archives, results in zip(archives_by_dir.values(), executor.map(_extract_dir, archives_by_dir.values())):
+            for (kind, file_path), result in zip(archives, results):
+                if not result:
                     failed_extractions.append(file_path)
+                elif kind == 'zip':
+                    extracted_files.extend(result)
+                else:
+                    extracted_files.append(result)
 
     logger.debug(f"Extraction complete. Extracted {len(extracted_files)} files, {len(failed_extractions)} failures")
 
@@ -59,11 +73,27 @@ def unzip_all():
     return extracted_files, failed_extractions
 
 
-def extract_zip(zip_path: str) -> list[str] | None:
+def _extract_dir(archives: list[tuple[str, str]]) -> list[list[str] | str | None]:
+    """Extract one directory's (kind, path) archives in turn; runs in a worker process."""
+    results = []
+    for kind, file_path in archives:
+        if kind == 'zip':
+            results.append(extract_zip(file_path))
+        else:
+            results.append(extract_gzip(file_path))
+    return results
+
+
+def extract_zip(zip_path: str, verify: bool = False) -> list[str] | None:
     """Extract a zip archive to its containing directory.
 
+    CRCs are checked as members are extracted, so a corrupt member fails
+    the extraction without a separate pass over the archive.
+
     Args:
         zip_path: Path to the zip file.
+        verify: Check every member's CRC before extracting anything, at the
+            cost of decompressing the archive twice.
 
     Returns:
         List of extracted file paths, or None on failure.
@@ -73,16 +103,18 @@ def extract_zip(zip_path: str) -> list[str] | None:
 
     try:
         with zipfile.ZipFile(zip_path, 'r') as zf:
-            # Check for valid zip
-            if zf.testzip() is not None:
+            # Optionally check the whole archive before writing any files
+            if verify and zf.testzip() is not None:
                 logger.error(f"Zip file is corrupted: {zip_path}")
                 return None
 
-            members = zf.namelist()
-            logger.debug(f"Zip contains {len(members)} members")
+            infos = zf.infolist()
+            logger.debug(f"Zip contains {len(infos)} members")
 
-            zf.extractall(extract_dir)
-            extracted = [os.path.join(extract_dir, m) for m in members if not m.endswith('/')]
+            # Directories are created as needed for the files inside them
+            file_infos = [info for info in infos if not info.is_dir()]
+            zf.extractall(extract_dir, members=file_infos)
+            extracted = [os.path.join(extract_dir, info.filename) for info in file_infos]
             logger.debug(f"Successfully extracted {len(extracted)} files from {zip_path}")
             return extracted
 
@@ -119,8 +151,14 @@ def extract_gzip(gzip_path: str) -> str | None:
 
     try:
         with gzip.open(gzip_path, 'rb') as f_in:
+            if hasattr(os, 'posix_fadvise'):
+                # Archives are read once, front to back
+                os.posix_fadvise(f_in.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
             with open(output_path, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
+                shutil.copyfileobj(f_in, f_out, length=copy_buffer_size)
+            if hasattr(os, 'posix_fadvise'):
+                # Don't keep the archive in the page cache once extracted
+                os.posix_fadvise(f_in.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
 
         logger.debug(f"Successfully extracted {gzip_path} to {output_path}")
         return output_path
@@ -22,12 +22,23 @@ CSV_FIELDNAMES = [
     "date",
     "file_name",
     "file_size",
+    "file_size_bytes",
     "contains_MS1002511",
     "parseable",
     "schema_version",
     "schema_valid",
     "error_message",
 ]
+# Column positions in report rows, which are handled as plain lists
+PROJECT = CSV_FIELDNAMES.index("project")
+FILE_NAME = CSV_FIELDNAMES.index("file_name")
+FILE_SIZE = CSV_FIELDNAMES.index("file_size")
+FILE_SIZE_BYTES = CSV_FIELDNAMES.index("file_size_bytes")
+CONTAINS_MS1002511 = CSV_FIELDNAMES.index("contains_MS1002511")
+PARSEABLE = CSV_FIELDNAMES.index("parseable")
+SCHEMA_VERSION = CSV_FIELDNAMES.index("schema_version")
+SCHEMA_VALID = CSV_FIELDNAMES.index("schema_valid")
+ERROR_MESSAGE = CSV_FIELDNAMES.index("error_message")
 
 
 def parse_file_size(size_str: str) -> int:
@@ -43,12 +54,85 @@ def parse_file_size(size_str: str) -> int:
     return int(float(size_str))
 
 
-def find_file_path(project: str, filename: str) -> str | None:
-    """Find full file path given project and filename."""
+def file_size_bytes(row: list[str]) -> int:
+    """Size of a report row's file in bytes.
+
+    Rows from reports written before the file_size_bytes column existed fall
+    back to parsing the human-readable size.
+    """
+    if row[FILE_SIZE_BYTES]:
+        return int(row[FILE_SIZE_BYTES])
+    return parse_file_size(row[FILE_SIZE])
+
+
+def read_rows(csv_path: str) -> list[list[str]]:
+    """Read a report CSV into lists ordered as CSV_FIELDNAMES.
+
+    Reports with other columns (e.g. from before a column was added) are
+    rearranged to match, with missing columns left empty.
+    """
+    with open(csv_path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        rows = list(reader)
+
+    if header is not None and header != CSV_FIELDNAMES:
+        positions = [header.index(name) if name in header else None for name in CSV_FIELDNAMES]
+        rows = [
+            [row[i] if i is not None and i < len(row) else "" for i in positions]
+            for row in rows
+        ]
+    return rows
+
+
+def build_file_index() -> dict[tuple[str, str], str]:
+    """Walk mzid_store once and map (project, filename) to full file path."""
+    index = {}
     for dirpath, dirnames, filenames in os.walk(MZID_STORE):
-        if filename in filenames and dirpath.endswith(project):
-            return os.path.join(dirpath, filename)
-    return None
+        project = os.path.basename(dirpath)
+        for filename in filenames:
+            # Keep the first match, as a walk per lookup would have found it
+            index.setdefault((project, filename), os.path.join(dirpath, filename))
+    return index
+
+
+def apply_progress(rows: list[list[str]], progress_path: str) -> int:
+    """Merge results from a progress file left by an interrupted run into rows.
+
+    Returns:
+        Number of results merged
+    """
+    if not os.path.exists(progress_path):
+        return 0
+
+    rows_by_key = {(r[PROJECT], r[FILE_NAME]): r for r in rows}
+    merged = 0
+    with open(progress_path, "r", newline="") as f:
+        for line_num, result in enumerate(csv.reader(f), start=1):
+            # A run killed mid-write can leave a truncated last line
+            if len(result) != 5:
+                logger.warning(f"Skipping malformed line {line_num} in {progress_path}")
+                continue
+            project, file_name, schema_valid, schema_version, error_message = result
+            row = rows_by_key.get((project, file_name))
+            if row is not None:
+                row[SCHEMA_VALID] = schema_valid
+                row[SCHEMA_VERSION] = schema_version
+                row[ERROR_MESSAGE] = error_message
+                merged += 1
+    return merged
+
+
+def write_rows(csv_path: str, rows: list[list[str]], progress_path: str):
+    """Write all rows back to the CSV, then drop the progress file they include."""
+    tmp_path = csv_path + ".tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDNAMES)
+        writer.writerows(rows)
+    os.replace(tmp_path, csv_path)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
 
 
 def validate_schemas(csv_path: str, label: str, filter_func=None):
@@ -58,17 +142,26 @@ def validate_schemas(csv_path: str, label: str, filter_func=None):
         csv_path: Path to the CSV file to read/update
         label: Label for logging (e.g., "crosslinking", "non-crosslinking")
         filter_func: Optional function to filter rows (returns True to include)
+
+    Each result is appended to <csv_path>.progress as it comes in, as
+    (project, file_name, schema_valid, schema_version, error_message), and the
+    CSV itself is rewritten once at the end (or when stopping early).
     """
     if not os.path.exists(csv_path):
         logger.warning(f"{label} report not found: {csv_path}")
         return
 
-    # Read all rows and sort by file size
-    with open(csv_path, "r", newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    # Read all rows
+    rows = read_rows(csv_path)
+
+    # Pick up results from a run that stopped before rewriting the CSV
+    progress_path = csv_path + ".progress"
+    merged = apply_progress(rows, progress_path)
+    if merged:
+        logger.info(f"Recovered {merged} results from {progress_path}")
 
-    rows.sort(key=lambda r: parse_file_size(r["file_size"]))
+    # Sort by file size
+    rows.sort(key=file_size_bytes)
 
     # Filter rows if filter function provided
     if filter_func:
@@ -78,80 +171,75 @@ def validate_schemas(csv_path: str, label: str, filter_func=None):
 
     logger.info(f"Validating schemas for {len(rows_to_validate)} {label} files")
 
+    # Look up file paths from one walk rather than walking per row
+    file_index = build_file_index()
+
     # Process each row and update schema_valid/error_message
-    for i, row in enumerate(rows_to_validate):
-        if row["parseable"] != "True":
-            continue  # Skip unparseable files
-
-        # Skip already validated files
-        if row["schema_valid"] in ("True", "False"):
-            logger.debug(f"Skipping already validated: {row['file_name']}")
-            continue
-
-        file_path = find_file_path(row["project"], row["file_name"])
-        if not file_path:
-            logger.warning(f"Could not find file: {row['project']}/{row['file_name']}")
-            continue
-
-        logger.info(f"[{i+1}/{len(rows_to_validate)}] Validating schema: {file_path}")
-
-        try:
-            schema_valid, schema_version, messages = schema_validate_with_messages(file_path)
-            row["schema_version"] = schema_version or ""
-            # Check if validation timed out
-            if messages and "timed out" in messages[0].lower():
-                row["schema_valid"] = "timed out"
-                row["error_message"] = messages[0]
-            elif schema_valid:
-                row["schema_valid"] = True
-                row["error_message"] = ""
-            else:
-                row["schema_valid"] = False
-                row["error_message"] = "; ".join(messages) if messages else ""
-        except MemoryError as e:
-            row["schema_valid"] = "out of memory"
-            row["error_message"] = f"Memory error: {e}"
-            logger.error(f"Memory error validating {file_path}. Stopping - larger files will also fail.")
-            # Write final state before stopping
-            with open(csv_path, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
-                writer.writeheader()
-                writer.writerows(rows)
-            return  # Stop processing
-        except (EOFError, BrokenPipeError, ConnectionResetError) as e:
-            # Subprocess was likely killed (OOM or other)
-            row["schema_valid"] = "out of memory"
-            row["error_message"] = f"Subprocess killed: {e}"
-            logger.error(f"Subprocess killed validating {file_path}. Stopping - larger files will also fail.")
-            # Write final state before stopping
-            with open(csv_path, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
-                writer.writeheader()
-                writer.writerows(rows)
-            return  # Stop processing
-        except Exception as e:
-            error_str = str(e).lower()
-            error_type = type(e).__name__.lower()
-            # Detect memory-related subprocess failures
-            if any(term in error_str + error_type for term in ["kill", "memory", "oom", "signal 9", "cannot allocate", "worker"]):
-                row["schema_valid"] = "out of memory"
-                row["error_message"] = f"Memory/process error: {e}"
-                logger.error(f"Likely memory error validating {file_path}. Stopping - larger files will also fail.")
+    with open(progress_path, "a", newline="") as progress_file:
+        progress = csv.writer(progress_file)
+        for i, row in enumerate(rows_to_validate):
+            if row[PARSEABLE] != "True":
+                continue  # Skip unparseable files
+
+            # Skip already validated files
+            if row[SCHEMA_VALID] in ("True", "False"):
+                logger.debug(f"Skipping already validated: {row[FILE_NAME]}")
+                continue
+
+            file_path = file_index.get((row[PROJECT], row[FILE_NAME]))
+            if not file_path:
+                logger.warning(f"Could not find file: {row[PROJECT]}/{row[FILE_NAME]}")
+                continue
+
+            logger.info(f"[{i+1}/{len(rows_to_validate)}] Validating schema: {file_path}")
+
+            try:
+                schema_valid, schema_version, messages = schema_validate_with_messages(file_path)
+                row[SCHEMA_VERSION] = schema_version or ""
+                # Check if validation timed out
+                if messages and "timed out" in messages[0].lower():
+                    row[SCHEMA_VALID] = "timed out"
+                    row[ERROR_MESSAGE] = messages[0]
+                elif schema_valid:
+                    row[SCHEMA_VALID] = True
+                    row[ERROR_MESSAGE] = ""
+                else:
+                    row[SCHEMA_VALID] = False
+                    row[ERROR_MESSAGE] = "; ".join(messages) if messages else ""
+            except MemoryError as e:
+                row[SCHEMA_VALID] = "out of memory"
+                row[ERROR_MESSAGE] = f"Memory error: {e}"
+                logger.error(f"Memory error validating {file_path}. Stopping - larger files will also fail.")
+                # Write final state before stopping
+                write_rows(csv_path, rows, progress_path)
+                return  # Stop processing
+            except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+                # Subprocess was likely killed (OOM or other)
+                row[SCHEMA_VALID] = "out of memory"
+                row[ERROR_MESSAGE] = f"Subprocess killed: {e}"
+                logger.error(f"Subprocess killed validating {file_path}. Stopping - larger files will also fail.")
                 # Write final state before stopping
-                with open(csv_path, "w", newline="") as f:
-                    writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
-                    writer.writeheader()
-                    writer.writerows(rows)
+                write_rows(csv_path, rows, progress_path)
                 return  # Stop processing
-            row["schema_valid"] = False
-            row["error_message"] = f"Schema validation error: {e}"
+            except Exception as e:
+                error_str = str(e).lower()
+                error_type = type(e).__name__.lower()
+                # Detect memory-related subprocess failures
+                if any(term in error_str + error_type for term in ["kill", "memory", "oom", "signal 9", "cannot allocate", "worker"]):
+                    row[SCHEMA_VALID] = "out of memory"
+                    row[ERROR_MESSAGE] = f"Memory/process error: {e}"
+                    logger.error(f"Likely memory error validating {file_path}. Stopping - larger files will also fail.")
+                    # Write final state before stopping
+                    write_rows(csv_path, rows, progress_path)
+                    return  # Stop processing
+                row[SCHEMA_VALID] = False
+                row[ERROR_MESSAGE] = f"Schema validation error: {e}"
 
-        # Write updated rows back after each file (incremental progress)
-        with open(csv_path, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
-            writer.writeheader()
-            writer.writerows(rows)
+            # Record the result (incremental progress)
+            progress.writerow((row[PROJECT], row[FILE_NAME], row[SCHEMA_VALID], row[SCHEMA_VERSION], row[ERROR_MESSAGE]))
+            progress_file.flush()
 
+    write_rows(csv_path, rows, progress_path)
     logger.info(f"Schema validation complete for {csv_path}")
 
 
@@ -163,7 +251,7 @@ def validate_crosslinking_schemas():
 def validate_report_schemas():
     """Validate schemas for non-crosslinking files in the main report."""
     def is_non_crosslinking(row):
-        return row["contains_MS1002511"] != "True"
+        return row[CONTAINS_MS1002511] != "True"
 
     validate_schemas(REPORT_PATH, "non-crosslinking", filter_func=is_non_crosslinking)
 